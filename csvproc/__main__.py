@@ -4,25 +4,31 @@ import argparse
 import sys
 import typing
 
-import csvproc.summarize as summarize
-
 
 def parse() -> typing.Optional[argparse.Namespace]:
     parser = argparse.ArgumentParser("csvproc", "csv file and column summarizer")
 
-    parser.add_argument("file", type=argparse.FileType('r'))
+    parser.add_argument("file", help="the path of the csv file to summarize")
 
+    # formats are parsed as plain strings and mapped to SummaryFormat in
+    # main(), so --help and usage errors never pay for the summarize import.
     out_group = parser.add_mutually_exclusive_group()
-    out_group.add_argument("--json", action="store_const", const=summarize.SummaryFormat.JSON, dest="format",
+    out_group.add_argument("--json", action="store_const", const="json", dest="format",
                            help="output the summary as json")
-    out_group.add_argument("--json-pretty", action="store_const", const=summarize.SummaryFormat.JSON_PRETTY, dest="format",
+    out_group.add_argument("--json-pretty", action="store_const", const="json-pretty", dest="format",
                            help="output the summary nicely formatted json")
-    out_group.add_argument("--default", action="store_const", const=summarize.SummaryFormat.DEFAULT, dest="format",
-                           default=summarize.SummaryFormat.DEFAULT,
+    out_group.add_argument("--default", action="store_const", const="default", dest="format",
+                           default="default",
                            help="use the default output format, displaying only relevant information")
-    out_group.add_argument("--verbose", action="store_const", const=summarize.SummaryFormat.VERBOSE, dest="format",
+    out_group.add_argument("--verbose", action="store_const", const="verbose", dest="format",
                            help="use the default output format, displaying all information")
-    parser.set_defaults(format=summarize.SummaryFormat.DEFAULT)
+    parser.set_defaults(format="default")
+
+    col_group = parser.add_mutually_exclusive_group()
+    col_group.add_argument("--columns", type=lambda arg: arg.split(","),
+                           help="only summarize the given comma separated columns")
+    col_group.add_argument("--count-only", action="store_true",
+                           help="only determine the record count, skipping all column summaries")
 
     if len(sys.argv) == 1:
         parser.print_help()
@@ -37,9 +43,24 @@ def main():
     if args is None:
         return
 
-    summary = summarize.CsvSummary(file=args.file)
+    import csvproc.summarize as summarize
+
+    summary_format = {
+        "default": summarize.SummaryFormat.DEFAULT,
+        "verbose": summarize.SummaryFormat.VERBOSE,
+        "json": summarize.SummaryFormat.JSON,
+        "json-pretty": summarize.SummaryFormat.JSON_PRETTY,
+    }[args.format]
+
+    columns = [] if args.count_only else args.columns
+
+    try:
+        summary = summarize.CsvSummary(path=args.file, columns=columns)
+    except OSError as error:
+        print(f"csvproc: {error}", file=sys.stderr)
+        sys.exit(1)
 
-    summary.write_summary(sys.stdout, args.format)
+    summary.write_summary(sys.stdout, summary_format)
 
 
 if __name__ == "__main__":
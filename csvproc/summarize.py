@@ -1,12 +1,52 @@
 from __future__ import annotations
 
+import concurrent.futures
 import csv
-import dataclasses
-import dateutil.parser
+import datetime
 import enum
+import functools
+import io
+import itertools
+import mmap
+import os
+import sys
 import typing
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# dateutil pulls in a non-trivial package tree and is only needed for exotic
+# date formats, so its import is deferred until a value actually requires it.
+_dateutil_parse = None
+
+
+def _classify_chars(value: str) -> "ColumnType":
+    """Classify a value with inline character checks, without raising.
+
+    :param value: The record value to classify.
+    :return: The value's type, or UNKNOWN when the value needs the slower
+        parser-based checks (scientific notation, exotic date formats, ...).
+    """
+    # strip at most one sign; int() and float() reject repeated dashes.
+    digits = value[1:] if value.startswith("-") else value
+
+    if digits.isdigit():
+        return ColumnType.INT
+
+    left, sep, right = digits.partition(".")
+    if sep and (left or right) and (not left or left.isdigit()) and (not right or right.isdigit()):
+        return ColumnType.FLOAT
+
+    # iso 8601 date prefix (YYYY-MM-DD).
+    if len(value) >= 10 and value[4] == "-" and value[7] == "-" \
+            and value[:4].isdigit() and value[5:7].isdigit() and value[8:10].isdigit():
+        return ColumnType.DATETIME
+
+    return ColumnType.UNKNOWN
+
 
 @enum.unique
 class ColumnType(enum.IntEnum):
@@ -28,26 +68,48 @@ class ColumnType(enum.IntEnum):
     STRING = 9
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def determine_type(value: str) -> ColumnType:
-        """Determine the data type of the column"""
+        """Determine the data type of the column.
+
+        Cheap checks (int, float) run before the expensive dateutil parse,
+        and results are cached per unique value since repeated values are
+        common in csv data.
+        """
+        val_type: ColumnType = _classify_chars(value)
+
+        if val_type != ColumnType.UNKNOWN:
+            return val_type
+
         try:
             float(value)
             return ColumnType.FLOAT
         except ValueError:
             pass
 
+        # fromisoformat is implemented in C and covers the common iso 8601
+        # case far faster than dateutil's parser.
         try:
-            int(value)
-            return ColumnType.INT
-        except ValueError:
-            pass
-
-        try:
-            dateutil.parser.parse(value)
+            datetime.datetime.fromisoformat(value)
             return ColumnType.DATETIME
         except ValueError:
             pass
 
+        # only consult the expensive dateutil parser for values that could
+        # plausibly be a date in some exotic format.
+        if 6 <= len(value) <= 30 and any(sep in value for sep in "-/ :") \
+                and any(char.isdigit() for char in value):
+            global _dateutil_parse
+            if _dateutil_parse is None:
+                from dateutil.parser import parse
+                _dateutil_parse = parse
+
+            try:
+                _dateutil_parse(value)
+                return ColumnType.DATETIME
+            except ValueError:
+                pass
+
         return ColumnType.STRING
 
 
@@ -66,13 +128,18 @@ class SummaryFormat(enum.Enum):
     JSON_PRETTY = enum.auto()
 
 
-@dataclasses.dataclass(frozen=True)
 class ColumnSummary:
+    # cap on the number of choices kept per column; past this many distinct
+    # values a column is no longer a useful enum and tracking stops.
+    ENUM_CAP = 32
+
+    __slots__ = ("field_name", "type", "choices", "optional", "boolean")
+
     field_name: str
     type: ColumnType
     choices: typing.Set[str]
-    optional: bool = False
-    boolean: bool = False
+    optional: bool
+    boolean: bool
 
     def __init__(self, field_name: str, values: typing.Set[str]):
         """A simple summary class describing a single column in a csv file.
@@ -80,33 +147,71 @@ class ColumnSummary:
         :param field_name: The field title of the column.
         :param values: All the values under the column.
         """
-        object.__setattr__(self, "field_name", field_name)
-        object.__setattr__(self, "choices", values)
+        self.field_name = field_name
+        self.choices = values
+        self.boolean = len(values) == 2
 
-        if len(values) == 2:
-            object.__setattr__(self, "boolean", True)
+        # a single set lookup replaces checking each value for emptiness, and
+        # keeps the early break below from missing empty values after it.
+        self.optional = "" in values
 
         column_type: ColumnType = ColumnType.UNKNOWN
         for val in values:
             if not val:
-                object.__setattr__(self, "optional", True)
+                continue
 
             val_type: ColumnType = ColumnType.determine_type(val)
 
             if val_type > column_type:
                 column_type = val_type
 
-            if val_type == ColumnType.STRING:
+            if column_type == ColumnType.STRING:
                 break
 
-        object.__setattr__(self, "type", column_type)
+        self.type = column_type
+
+    @classmethod
+    def from_aggregate(cls, field_name: str, column_type: ColumnType,
+                       choices: typing.Set[str], optional: bool) -> ColumnSummary:
+        """Build a summary from aggregates collected during a csv parse.
+
+        Unlike `__init__` this does not rescan the values, the caller is
+        expected to have already determined the column type and optional
+        status.
+
+        :param field_name: The field title of the column.
+        :param column_type: The already determined type of the column.
+        :param choices: A (possibly capped) set of values seen under the column.
+        :param optional: Whether any record was missing a value for the column.
+        """
+        summary = object.__new__(cls)
+
+        summary.field_name = field_name
+        summary.type = column_type
+        summary.choices = choices
+        summary.optional = optional
+        summary.boolean = len(choices) == 2
+
+        return summary
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """Get the summary as a dict of json-serializable primitives."""
+        return {
+            "field_name": self.field_name,
+            "type": self.type.value,
+            "choices": list(self.choices),
+            "optional": self.optional,
+            "boolean": self.boolean
+        }
 
 
 class SummaryEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, CsvSummary):
+            # the encoder's own traversal will call default() again for each
+            # ColumnSummary in the list, no need to pre-encode them here.
             return {
-                "columns": [self.default(column) for column in obj.columns],
+                "columns": list(obj.columns),
                 "record_count": obj.record_count
             }
 
@@ -122,13 +227,146 @@ class SummaryEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 
-@dataclasses.dataclass(frozen=True)
+# reusable encoder instances, so write_summary does not build a fresh encoder
+# on every call.
+_ENCODER = SummaryEncoder()
+_PRETTY_ENCODER = SummaryEncoder(indent=2)
+
+
+@functools.lru_cache(maxsize=None)
+def _column_template(boolean: bool, show_optional: bool) -> str:
+    """Build the text template for a column's section of the summary.
+
+    Built once per unique (boolean, show optional) layout, hoisting the
+    branching out of the per-column loop in `CsvSummary.write_summary`.
+    """
+    template = "Field Name: {field_name}\nType: {type}"
+
+    template += ", boolean\n" if boolean else "\n"
+
+    if show_optional:
+        template += "Optional: {optional}\n"
+
+    return template + "{choices}\n\n"
+
+
+# files smaller than this are not worth the process startup cost to parallelize.
+_PARALLEL_THRESHOLD = 1 << 20
+
+
+def _advise_sequential(file: typing.IO):
+    """Hint the kernel that the file will be read front to back, so it can
+    read ahead aggressively. A no-op on platforms without posix_fadvise.
+    """
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+
+def _aggregate_rows(rows: typing.Iterable[typing.List[str]], column_count: int) \
+        -> typing.Tuple[int, typing.List[ColumnType], typing.List[bool], typing.List[typing.Set[str]]]:
+    """Collect per-column aggregates from an iterable of csv rows.
+
+    :param rows: The parsed csv rows, not including the header.
+    :param column_count: The number of columns in the csv.
+    :return: A tuple of (record count, column types, optional flags, choices).
+    """
+    record_count: int = 0
+    col_types: typing.List[ColumnType] = [ColumnType.UNKNOWN] * column_count
+    col_optional: typing.List[bool] = [False] * column_count
+    col_choices: typing.List[typing.Set[str]] = [set() for _ in range(column_count)]
+    col_done: typing.List[bool] = [False] * column_count
+
+    for row in rows:
+        record_count += 1
+
+        for i, val in enumerate(row):
+            if col_done[i]:
+                continue
+
+            if not val:
+                col_optional[i] = True
+                continue
+
+            if col_types[i] != ColumnType.STRING:
+                val_type: ColumnType = ColumnType.determine_type(val)
+
+                if val_type > col_types[i]:
+                    col_types[i] = val_type
+
+            if len(col_choices[i]) < ColumnSummary.ENUM_CAP:
+                # interned strings are shared across columns with correlated
+                # values and compare by identity before hashing; long values
+                # are unlikely to repeat and would only grow the intern table.
+                col_choices[i].add(sys.intern(val) if len(val) <= 32 else val)
+            elif col_types[i] == ColumnType.STRING and col_optional[i]:
+                # nothing left to learn about this column.
+                col_done[i] = True
+
+    return record_count, col_types, col_optional, col_choices
+
+
+def _project_rows(rows: typing.Iterable[typing.List[str]], target_indices: typing.List[int]) \
+        -> typing.Iterator[typing.List[str]]:
+    """Restrict rows to the given column indices, padding short rows with ''.
+
+    :param rows: The parsed csv rows, not including the header.
+    :param target_indices: The indices of the columns to keep, in order.
+    """
+    return ([row[i] if i < len(row) else "" for i in target_indices] for row in rows)
+
+
+def _aggregate_unquoted(text: str, column_count: int,
+                        target_indices: typing.List[int] = None) \
+        -> typing.Tuple[int, typing.List[ColumnType], typing.List[bool], typing.List[typing.Set[str]]]:
+    """Collect per-column aggregates from csv text with no quoted fields.
+
+    `str.splitlines` and `str.split` find every delimiter in bulk at the C
+    level rather than stepping through the csv module's per-row machinery,
+    but are only correct when no field is quoted.
+
+    :param text: The csv text, not including the header.
+    :param column_count: The number of columns in the csv.
+    :param target_indices: Optional indices of the only columns to aggregate.
+    """
+    rows = (line.split(",") for line in text.splitlines())
+
+    if target_indices is not None:
+        rows = _project_rows(rows, target_indices)
+        column_count = len(target_indices)
+
+    return _aggregate_rows(rows, column_count)
+
+
+def _summarize_chunk(path: str, start: int, end: int, column_count: int,
+                     target_indices: typing.List[int] = None) \
+        -> typing.Tuple[int, typing.List[ColumnType], typing.List[bool], typing.List[typing.Set[str]]]:
+    """Aggregate a byte range of a csv file, for use in a worker process.
+
+    The caller guarantees the range contains no quoted fields.
+
+    :param path: The path of the csv file.
+    :param start: The byte offset of the first row in the chunk.
+    :param end: The byte offset just past the last row in the chunk.
+    :param column_count: The number of columns in the csv.
+    :param target_indices: Optional indices of the only columns to aggregate.
+    """
+    with open(path, "rb") as file:
+        _advise_sequential(file)
+        file.seek(start)
+        data = file.read(end - start)
+
+    return _aggregate_unquoted(data.decode(), column_count, target_indices)
+
+
 class CsvSummary:
+    __slots__ = ("path", "columns", "record_count")
+
     path: str
     columns: typing.List[ColumnSummary]
     record_count: int
 
-    def __init__(self, *, file: typing.TextIO = None, path: str = None):
+    def __init__(self, *, file: typing.TextIO = None, path: str = None,
+                 workers: int = None, columns: typing.Iterable[str] = None):
         """A basic summary describing a csv file's structure and contents.
 
         One or both 'file' and 'path' must be provided; however, if both are
@@ -136,40 +374,154 @@ class CsvSummary:
 
         :param file: The file like object to use for parsing the csv.
         :param path: The path of the file to use for parsing the csv.
+        :param workers: The number of processes to parse with when given a
+            path to a large csv, defaults to the cpu count.
+        :param columns: An optional subset of column names to summarize; an
+            empty collection skips per-column work entirely, leaving only
+            the record count.
         """
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        targets = None if columns is None else set(columns)
+
         if file is not None:
-            self.__summarize(file)
-            object.__setattr__(self, "path", file.name)
+            self.__summarize(file, targets)
+            self.path = file.name
         elif path is not None:
-            with open(path) as file:
-                self.__summarize(file)
-            object.__setattr__(self, "path", path)
+            if not self.__summarize_mapped(path, workers, targets):
+                # a large read buffer cuts syscalls per MB, newline='' is the
+                # csv module's recommended mode, and utf-8-sig eats any bom.
+                with open(path, "r", buffering=1 << 20, encoding="utf-8-sig", newline="") as file:
+                    _advise_sequential(file)
+                    self.__summarize(file, targets)
+            self.path = path
         else:
             raise Exception("One of 'file' or 'path' must be specified")
 
-    def __summarize(self, file: typing.TextIO):
+    def __summarize(self, file: typing.TextIO, targets: typing.Set[str] = None):
         """Parse and initialize summary values.
         todo: validate csv data
             not empty
             has headers
 
         :param file: The source file like object for the csv reader.
+        :param targets: An optional subset of column names to summarize.
         """
-        reader = csv.DictReader(file)
-        columns: typing.Dict[str, typing.Set[str]] = {field_name: set() for field_name in reader.fieldnames}
+        reader = csv.reader(file)
+        fieldnames: typing.List[str] = next(reader)
+        rows: typing.Iterable[typing.List[str]] = reader
 
-        object.__setattr__(self, "record_count", reader.line_num)
+        if targets is not None:
+            indices = [i for i, name in enumerate(fieldnames) if name in targets]
+            fieldnames = [fieldnames[i] for i in indices]
+            rows = _project_rows(reader, indices)
 
-        for row in reader:
-            for key, val in row.items():
-                if val:
-                    columns[key].add(val)
+        self.__from_aggregates(fieldnames, *_aggregate_rows(rows, len(fieldnames)))
 
-        object.__setattr__(self, "columns", list())
+    def __summarize_mapped(self, path: str, workers: int,
+                           targets: typing.Set[str] = None) -> bool:
+        """Summarize a csv file through a memory map of its contents.
 
-        for field_name, values in columns.items():
-            summary = ColumnSummary(field_name, values)
-            self.columns.append(summary)
+        Only files over `_PARALLEL_THRESHOLD` bytes with no quoted fields are
+        handled, since the bulk row splitting (and the chunking for parallel
+        parses) splits on newlines which quoted fields may contain.
+
+        :param path: The path of the file to use for parsing the csv.
+        :param workers: The number of worker processes to parse with; 1 parses
+            the mapped bytes in process.
+        :param targets: An optional subset of column names to summarize.
+        :return: True if the file was summarized, False if the caller should
+            fall back to the buffered text path.
+        """
+        size = os.path.getsize(path)
+
+        if size < _PARALLEL_THRESHOLD:
+            return False
+
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+
+            if mm.find(b'"') != -1:
+                return False
+
+            header_end = mm.find(b"\n")
+
+            if header_end == -1:
+                return False
+
+            # utf-8-sig keeps a bom out of the first fieldname, matching the
+            # buffered text path.
+            fieldnames = next(csv.reader(io.StringIO(mm[:header_end].decode("utf-8-sig"))))
+
+            indices: typing.List[int] = None
+            if targets is not None:
+                indices = [i for i, name in enumerate(fieldnames) if name in targets]
+                fieldnames = [fieldnames[i] for i in indices]
+
+                if not indices:
+                    # pure record counting, done with bulk bytes.count over
+                    # large reads instead of any row parsing.
+                    file.seek(header_end + 1)
+                    record_count = sum(chunk.count(b"\n")
+                                       for chunk in iter(lambda: file.read(1 << 20), b""))
+
+                    if size > header_end + 1 and mm[size - 1] != ord("\n"):
+                        record_count += 1
+
+                    self.__from_aggregates([], record_count, [], [], [])
+                    return True
+
+            if workers <= 1:
+                self.__from_aggregates(
+                    fieldnames,
+                    *_aggregate_unquoted(mm[header_end + 1:].decode(), len(fieldnames), indices))
+                return True
+
+            # split into roughly equal chunks, advancing each boundary to the
+            # next newline so no row straddles two chunks.
+            bounds: typing.List[int] = [header_end + 1]
+            for n in range(1, workers):
+                boundary = mm.find(b"\n", max(bounds[-1], size * n // workers))
+                bounds.append(size if boundary == -1 else boundary + 1)
+            bounds.append(size)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(
+                _summarize_chunk,
+                itertools.repeat(path), bounds[:-1], bounds[1:],
+                itertools.repeat(len(fieldnames)), itertools.repeat(indices)))
+
+        record_count = sum(partial[0] for partial in partials)
+        col_types = [max(partial[1][i] for partial in partials) for i in range(len(fieldnames))]
+        col_optional = [any(partial[2][i] for partial in partials) for i in range(len(fieldnames))]
+        col_choices = [
+            set(itertools.islice(set().union(*(partial[3][i] for partial in partials)), ColumnSummary.ENUM_CAP))
+            for i in range(len(fieldnames))
+        ]
+
+        self.__from_aggregates(fieldnames, record_count, col_types, col_optional, col_choices)
+
+        return True
+
+    def __from_aggregates(self, fieldnames: typing.List[str], record_count: int,
+                          col_types: typing.List[ColumnType], col_optional: typing.List[bool],
+                          col_choices: typing.List[typing.Set[str]]):
+        """Initialize summary fields from per-column aggregates."""
+        self.record_count = record_count
+
+        self.columns = [
+            ColumnSummary.from_aggregate(name, col_types[i], col_choices[i], col_optional[i])
+            for i, name in enumerate(fieldnames)
+        ]
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """Get the summary as a dict of json-serializable primitives."""
+        return {
+            "columns": [column.to_dict() for column in self.columns],
+            "record_count": self.record_count
+        }
 
     def write_summary(self, file: typing.TextIO, summary_format: SummaryFormat,
                       encoder: typing.Type[json.JSONEncoder] = SummaryEncoder):
@@ -180,28 +532,53 @@ class CsvSummary:
         :param encoder: The json encoder to use if writing summary as JSON, ignored otherwise.
         """
 
+        # orjson is only a substitute for the stock encoder; a caller-supplied
+        # encoder always takes precedence over it.
+        use_orjson = orjson is not None and encoder is SummaryEncoder
+
         if summary_format == SummaryFormat.JSON:
-            summary: str = json.dumps(self, cls=encoder)
+            # stream one column at a time so peak memory stays proportional
+            # to a single column rather than the whole output.
+            column_encoder = _ENCODER if encoder is SummaryEncoder else encoder()
 
-        elif summary_format == SummaryFormat.JSON_PRETTY:
-            summary: str = json.dumps(self, cls=encoder, indent=2)
+            file.write('{"columns": [')
 
-        elif summary_format == SummaryFormat.DEFAULT or summary_format == SummaryFormat.VERBOSE:
-            summary: str = (f"=== {self.path} ====\n"
-                            f"Record Count: {self.record_count}\n\n")
+            for i, column in enumerate(self.columns):
+                if i:
+                    file.write(",")
+
+                if use_orjson:
+                    file.write(orjson.dumps(column.to_dict()).decode())
+                else:
+                    file.write(column_encoder.encode(column))
+
+            file.write(f'], "record_count": {self.record_count}}}')
 
-            for column in self.columns:
-                summary += (f"Field Name: {column.field_name}\n"
-                            f"Type: {column.type.name.lower()}")
+            return
 
-                summary += ", boolean\n" if column.boolean else "\n"
+        if summary_format == SummaryFormat.JSON_PRETTY:
+            if use_orjson:
+                summary: str = orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2).decode()
+            elif encoder is SummaryEncoder:
+                summary: str = _PRETTY_ENCODER.encode(self)
+            else:
+                summary: str = json.dumps(self, cls=encoder, indent=2)
+
+        elif summary_format == SummaryFormat.DEFAULT or summary_format == SummaryFormat.VERBOSE:
+            verbose = summary_format == SummaryFormat.VERBOSE
 
-                if summary_format == SummaryFormat.VERBOSE or column.optional:
-                    summary += f"Optional: {column.optional}\n"
+            parts: typing.List[str] = [f"=== {self.path} ====\n"
+                                       f"Record Count: {self.record_count}\n\n"]
 
-                summary += str(column.choices)
+            parts.extend(
+                _column_template(column.boolean, verbose or column.optional).format(
+                    field_name=column.field_name,
+                    type=column.type.name.lower(),
+                    optional=column.optional,
+                    choices=column.choices)
+                for column in self.columns)
 
-                summary += "\n\n"
+            summary: str = "".join(parts)
 
         else:
             raise Exception("Unsupported summary format")